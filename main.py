@@ -1,50 +1,128 @@
 import csv
+import functools
 import json
+import os
 import sys
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 import itertools
 import argparse
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+CHUNK_SIZE = 10_000
+worker_state = None
+
 
 class DataLoader:
     """Handles reading and validating CSV files."""
     def __init__(self, sentence_file, people_file, common_words_file):
-        self.sentences = self.read_csv(sentence_file, "sentence")
+        self.sentence_file = sentence_file
+        # Pull one row so a missing file or bad header fails at startup; the body is streamed later.
+        next(self.iter_csv(sentence_file, "sentence"), None)
         self.people = self.read_people_csv(people_file)
+        self.alias_to_names = self.index_aliases(self.people)
         self.common_words = self.read_csv(common_words_file, "word", single_column=True)
 
+    def iter_sentences(self):
+        """Streams the sentences without loading the whole file."""
+        for row in self.iter_csv(self.sentence_file, "sentence"):
+            yield row[0]
+
     def read_csv(self, file_path, expected_header, single_column=False):
         """Reads a CSV file and validates its format."""
+        return list(self.iter_csv(file_path, expected_header, single_column))
+
+    def iter_csv(self, file_path, expected_header, single_column=False):
+        """Streams the rows of a CSV file after validating its header."""
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
+            with open(file_path, "r", encoding="utf-8", buffering=1 << 20) as file:
                 reader = csv.reader(file)
                 header = next(reader, None)
                 if not header or (not single_column and header[0] != expected_header):
                     raise ValueError("invalid input")
-                return [row[0] for row in reader] if single_column else [row for row in reader]
+                done = 0
+                if pa is not None:
+                    try:
+                        for columns in self.iter_column_batches(file_path, len(header), single_column):
+                            rows = columns[0] if single_column else [list(row) for row in zip(*columns)]
+                            yield from rows
+                            done += len(rows)
+                        return
+                    except pa.ArrowInvalid:
+                        pass
+                # pyarrow is missing or rejected the file: resume with csv after the rows it already gave.
+                # Blank lines are skipped here as pyarrow skips them, so both paths yield the same rows.
+                for row in itertools.islice((row for row in reader if row), done, None):
+                    yield row[0] if single_column else row
         except Exception:
             print(json.dumps("invalid input"))
             sys.exit(1)
 
+    @staticmethod
+    def iter_column_batches(file_path, column_count, single_column=False):
+        """Parses the rows after the header with pyarrow, one block of string columns at a time."""
+        names = [str(i) for i in range(column_count)]
+        reader = pa_csv.open_csv(
+            file_path,
+            # No reader threads: worker processes may be forked while this stream is open.
+            read_options=pa_csv.ReadOptions(skip_rows=1, column_names=names, block_size=1 << 20, use_threads=False),
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in names},
+                include_columns=names[:1] if single_column else names,
+            ),
+        )
+        for batch in reader:
+            yield [column.to_pylist() for column in batch.columns]
+
     def read_people_csv(self, file_path):
         """Reads people file and maps names to their variations."""
         people = {}
-        header, rows = self.read_csv(file_path, "Name"), []
-        for row in rows:
+        for row in self.read_csv(file_path, "Name"):
             if len(row) < 2:
                 continue
             name, other_names = row[0], row[1].split(",") if row[1] else []
-            people[name] = {name.lower()} | {n.strip().lower() for n in other_names}
+            people[name] = frozenset({name.lower(), *(n.strip().lower() for n in other_names if n.strip())})
         return people
 
+    @staticmethod
+    def index_aliases(people):
+        """Maps each non-empty alias to the names of everyone who uses it."""
+        alias_to_names = defaultdict(list)
+        for name, aliases in people.items():
+            for alias in aliases:
+                if alias:
+                    alias_to_names[alias].append(name)
+        return alias_to_names
+
 
 class TextProcessor:
     """Handles text preprocessing such as common word removal."""
     def __init__(self, common_words):
         self.common_words = set(word.lower() for word in common_words)
+        # Repeated sentences are common in scraped corpora; bounded so streaming stays bounded too.
+        self.preprocess = functools.lru_cache(maxsize=1 << 16)(self.remove_common_words)
+
+    def repeats(self):
+        """Returns how many preprocess calls so far repeated a recently seen sentence.
 
-    def preprocess(self, sentence):
+        Counted by the LRU cache, so repeats of sentences evicted from it are missed.
+        """
+        return self.preprocess.cache_info().hits
+
+    def remove_common_words(self, sentence):
         """Removes common words from a sentence."""
+        # Lower-casing per token is cheaper than lowering the sentence and splitting it twice.
         return " ".join([word for word in sentence.split() if word.lower() not in self.common_words])
 
 
@@ -53,40 +131,73 @@ class WordCounter:
     def __init__(self, sentences):
         self.sentences = sentences
 
-    def count_word_sequences(self, n=2):
-        """Counts occurrences of word sequences of length n."""
-        sequence_counts = defaultdict(int)
-        for sentence in self.sentences:
-            words = sentence.split()
-            for i in range(len(words) - n + 1):
-                sequence = " ".join(words[i:i + n])
-                sequence_counts[sequence] += 1
-        return dict(sorted(sequence_counts.items()))
+    def count_sequences(self, n=2):
+        """Counts word sequences of length n, keyed by word tuple."""
+        return Counter(itertools.chain.from_iterable(self.word_sequences(sentence, n) for sentence in self.sentences))
+
+    @staticmethod
+    def join_sequences(sequence_counts):
+        """Joins tuple keys into phrases and returns the counts sorted by phrase."""
+        sequence_counts = {" ".join(sequence): count for sequence, count in sequence_counts.items()}
+        return {sequence: sequence_counts[sequence] for sequence in sorted(sequence_counts)}
+
+    @staticmethod
+    def word_sequences(sentence, n):
+        """Returns an iterator over the length-n word tuples of a sentence."""
+        words = sentence.split()
+        return zip(*(words[i:] for i in range(n)))
 
 
 class PersonAnalyzer:
     """Analyzes person mentions and relationships."""
-    def __init__(self, people):
-        self.people = people
+    def __init__(self, alias_to_names):
+        self.alias_to_names = alias_to_names
+        self.automaton = self.build_automaton(alias_to_names)
+
+    @staticmethod
+    def build_automaton(alias_to_names):
+        """Builds one Aho-Corasick automaton over all aliases, or None if unavailable."""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for alias, names in alias_to_names.items():
+            automaton.add_word(alias, tuple(names))
+        if len(automaton) == 0:
+            return None
+        automaton.make_automaton()
+        return automaton
+
+    def mentioned_people(self, sentence_lower):
+        """Returns the names of everyone mentioned in a lower-cased sentence."""
+        mentioned = set()
+        if self.automaton is not None:
+            for _, names in self.automaton.iter(sentence_lower):
+                mentioned.update(names)
+        else:
+            for alias, names in self.alias_to_names.items():
+                if alias in sentence_lower:
+                    mentioned.update(names)
+        return mentioned
 
     def count_mentions(self, sentences):
         """Counts how often each person is mentioned."""
         mention_counts = defaultdict(int)
         for sentence in sentences:
-            for name, aliases in self.people.items():
-                if any(alias in sentence.lower() for alias in aliases):
-                    mention_counts[name] += 1
+            for name in self.mentioned_people(sentence.lower()):
+                mention_counts[name] += 1
         return dict(sorted(mention_counts.items()))
 
     def find_direct_connections(self, sentences):
         """Finds direct connections between people in the same sentence."""
         connections = defaultdict(set)
         for sentence in sentences:
-            mentioned_people = {name for name, aliases in self.people.items() if any(alias in sentence.lower() for alias in aliases)}
-            for p1, p2 in itertools.combinations(mentioned_people, 2):
-                connections[p1].add(p2)
-                connections[p2].add(p1)
-        return {k: sorted(v) for k, v in connections.items()}
+            mentioned = self.mentioned_people(sentence.lower())
+            if len(mentioned) < 2:
+                continue
+            # One set update per person instead of two add() calls per pair; self-links are dropped below.
+            for name in sorted(mentioned):
+                connections[name].update(mentioned)
+        return {k: sorted(v - {k}) for k, v in connections.items()}
 
 
 class GraphAnalyzer:
@@ -96,42 +207,146 @@ class GraphAnalyzer:
 
     def find_indirect_connections(self, person, target, max_depth=3):
         """Finds indirect paths between people up to a fixed depth."""
-        if person not in self.graph or target not in self.graph:
+        if person not in self.graph or target not in self.graph or person == target:
             return []
 
         paths = []
-        queue = [(person, [person])]
+        # Each entry is (node, parent entry); paths share their prefixes instead of being copied.
+        frontier = [(person, None)]
 
-        while queue:
-            current, path = queue.pop(0)
-            if len(path) > max_depth:
+        for depth in range(1, max_depth + 1):
+            last_level = depth == max_depth
+            next_frontier = []
+            for entry in frontier:
+                for neighbor in self.graph.get(entry[0], []):
+                    if neighbor == target:
+                        paths.append(self.build_path(entry, neighbor))
+                    elif not last_level and not self.on_path(entry, neighbor):
+                        next_frontier.append((neighbor, entry))
+            if not next_frontier:
                 break
-            for neighbor in self.graph.get(current, []):
-                if neighbor == target:
-                    paths.append(path + [neighbor])
-                elif neighbor not in path:
-                    queue.append((neighbor, path + [neighbor]))
+            frontier = next_frontier
 
         return paths
 
+    @staticmethod
+    def on_path(entry, node):
+        """Checks whether node is on the path ending at entry, walking at most max_depth parents."""
+        while entry is not None:
+            if entry[0] == node:
+                return True
+            entry = entry[1]
+        return False
+
+    @staticmethod
+    def build_path(entry, last):
+        """Walks parent entries back to the start to rebuild a path ending at last."""
+        path = [last]
+        while entry is not None:
+            path.append(entry[0])
+            entry = entry[1]
+        path.reverse()
+        return path
+
+
+def chunked(iterable, size):
+    """Yields lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def init_worker(state):
+    """Stores the per-task state in a worker process."""
+    global worker_state
+    worker_state = state
+
+
+def run_chunk(function, chunk):
+    """Applies a chunk function to one chunk inside a worker process."""
+    return function(worker_state, chunk)
+
+
+def sum_counts(partials):
+    """Adds up the count mappings produced for each chunk."""
+    total = Counter()
+    for partial in partials:
+        total.update(partial)
+    return total
+
+
+def merge_connections(partials):
+    """Unions the connections found in separate chunks of sentences."""
+    connections = defaultdict(set)
+    for partial in partials:
+        for name, neighbors in partial.items():
+            connections[name].update(neighbors)
+    return {k: sorted(v) for k, v in connections.items()}
+
 
 class TaskManager:
     """Handles task execution based on user input."""
     def __init__(self, data_loader):
+        self.data_loader = data_loader
         self.text_processor = TextProcessor(data_loader.common_words)
-        self.word_counter = WordCounter([self.text_processor.preprocess(s[0]) for s in data_loader.sentences])
-        self.person_analyzer = PersonAnalyzer(data_loader.people)
+        self.person_analyzer = PersonAnalyzer(data_loader.alias_to_names)
         self.graph_analyzer = None
 
+    def map_chunks(self, function, state):
+        """Yields function(state, chunk) for each chunk of sentences, in input order.
+
+        Chunks go to worker processes when there is more than one chunk and more
+        than one CPU; state is sent to each worker once, by the pool initializer.
+        """
+        cpus = os.cpu_count() or 1
+        if cpus == 1:
+            # Without a pool, one call over the whole stream avoids merging per-chunk results.
+            yield function(state, self.data_loader.iter_sentences())
+            return
+        chunks = chunked(self.data_loader.iter_sentences(), CHUNK_SIZE)
+        first, second = next(chunks, []), next(chunks, None)
+        if second is None:
+            yield function(state, first)
+            return
+        chunks = itertools.chain([first, second], chunks)
+        # Fork no more workers than there are chunks, estimated from the first chunk's size on disk.
+        chunk_bytes = max(sum(map(len, first)) + len(first), 1)
+        estimate = -(-os.path.getsize(self.data_loader.sentence_file) // chunk_bytes)
+        workers = min(cpus, max(estimate, 2))
+        # Keep a bounded number of chunks in flight so the input is still streamed.
+        window = 2 * workers
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(state,)) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(run_chunk, function, chunk))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def sorted_sentences(self):
+        """Sorts the preprocessed sentences, sorting each distinct sentence once when most are repeats."""
+        repeats = self.text_processor.repeats()
+        sentences = [self.text_processor.preprocess(s) for s in self.data_loader.iter_sentences()]
+        if self.text_processor.repeats() - repeats < 0.5 * len(sentences):
+            return sorted(sentences)
+        counts = Counter(sentences)
+        return [sentence for sentence in sorted(counts) for _ in range(counts[sentence])]
+
     def execute(self, task_number):
         if task_number == 1:
-            result = sorted([self.text_processor.preprocess(s[0]) for s in data_loader.sentences])
+            # Task 1 stays in-process: shipping every sentence out and back costs more than it saves.
+            result = self.sorted_sentences()
         elif task_number == 2:
-            result = self.word_counter.count_word_sequences()
+            # In-process too: merging, joining and dumping the large bigram Counters outweighs the counting.
+            sequence_counts = WordCounter(self.text_processor.preprocess(s) for s in self.data_loader.iter_sentences()).count_sequences()
+            result = WordCounter.join_sequences(sequence_counts)
         elif task_number == 3:
-            result = self.person_analyzer.count_mentions([s[0] for s in data_loader.sentences])
+            partials = self.map_chunks(PersonAnalyzer.count_mentions, self.person_analyzer)
+            result = dict(sorted(sum_counts(partials).items()))
         elif task_number == 6:
-            result = self.person_analyzer.find_direct_connections([s[0] for s in data_loader.sentences])
+            partials = self.map_chunks(PersonAnalyzer.find_direct_connections, self.person_analyzer)
+            result = merge_connections(partials)
             self.graph_analyzer = GraphAnalyzer(result)
         elif task_number == 7:
             if not self.graph_analyzer: